@@ -2,6 +2,12 @@ from passlib.context import CryptContext
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# passlib can fall back to a pure-Python bcrypt that is orders of magnitude
+# slower. Resolve the backend now and refuse to start on that one rather than
+# stall every login.
+if pwd_context.handler("bcrypt").get_backend() == "builtin":
+    raise RuntimeError("No compiled bcrypt backend found; install the 'bcrypt' package")
+
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
 
@@ -1,14 +1,87 @@
 from __future__ import annotations
+import asyncio
 import sqlite3
+from contextlib import asynccontextmanager
 from pathlib import Path
+from typing import AsyncIterator
+
+import aiosqlite
 
 BASE_DIR = Path(__file__).resolve().parents[1]
 DB_PATH = BASE_DIR / "data" / "app.db"
 
-def get_conn() -> sqlite3.Connection:
-    DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+
+_PRAGMAS = """
+PRAGMA foreign_keys = ON;
+PRAGMA journal_mode = WAL;
+PRAGMA synchronous = NORMAL;
+PRAGMA temp_store = MEMORY;
+PRAGMA cache_size = -64000;
+PRAGMA mmap_size = 268435456;
+PRAGMA busy_timeout = 5000;
+"""
+
+def connect() -> sqlite3.Connection:
+    """Blocking connection for scripts (migrations, seeding)."""
     conn = sqlite3.connect(DB_PATH)
     conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA foreign_keys = ON;")
+    conn.executescript(_PRAGMAS)
+    return conn
+
+READER_POOL_SIZE = 4
+
+# WAL allows one writer alongside any number of readers, so the app keeps one
+# read-write connection for writes and a small pool of read-only connections
+# for everything else; reads never queue behind a write. All are opened in the
+# lifespan handler and run on aiosqlite's own threads, so queries neither
+# block the event loop nor occupy the request threadpool.
+_WRITER: aiosqlite.Connection | None = None
+_READERS: asyncio.Queue[aiosqlite.Connection] = asyncio.Queue()
+
+# Writes span several awaits; the lock stops two requests interleaving their
+# statements inside one transaction on the writer.
+write_lock = asyncio.Lock()
+
+async def _open(uri: str) -> aiosqlite.Connection:
+    conn = await aiosqlite.connect(uri, uri=True, iter_chunk_size=256, cached_statements=256)
+    conn.row_factory = sqlite3.Row
+    await conn.executescript(_PRAGMAS)
     return conn
 
+async def open_db() -> None:
+    global _WRITER
+    # The writer goes first: it switches the file to WAL, which read-only
+    # connections cannot do themselves.
+    _WRITER = await _open(DB_PATH.as_uri())
+    for _ in range(READER_POOL_SIZE):
+        _READERS.put_nowait(await _open(f"{DB_PATH.as_uri()}?mode=ro"))
+
+async def close_db() -> None:
+    global _WRITER
+    while not _READERS.empty():
+        await _READERS.get_nowait().close()
+    if _WRITER is not None:
+        await _WRITER.close()
+        _WRITER = None
+
+@asynccontextmanager
+async def get_reader() -> AsyncIterator[aiosqlite.Connection]:
+    """Borrow a read-only connection from the pool."""
+    conn = await _READERS.get()
+    try:
+        yield conn
+    finally:
+        _READERS.put_nowait(conn)
+
+@asynccontextmanager
+async def get_writer() -> AsyncIterator[aiosqlite.Connection]:
+    """Run a write transaction on the writer: serialized, then committed, or
+    rolled back on error."""
+    async with write_lock:
+        try:
+            yield _WRITER
+        except BaseException:
+            await _WRITER.rollback()
+            raise
+        await _WRITER.commit()
@@ -1,15 +1,25 @@
-from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
-from starlette.middleware.sessions import SessionMiddleware
+from contextlib import asynccontextmanager
+
+from anyio import to_thread
+from cachetools import TTLCache
+from fastapi import Depends, FastAPI, Query, Request
+from fastapi.responses import JSONResponse, ORJSONResponse
 from starlette.middleware.cors import CORSMiddleware
 
-from app.db import get_conn
+from app.db import close_db, get_reader, get_writer, open_db
 from app.auth import verify_password
+from app.sessions import SessionStoreMiddleware
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await open_db()
+    yield
+    await close_db()
 
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse, lifespan=lifespan)
 
-# IMPORTANT: change to a strong random value in production
-app.add_middleware(SessionMiddleware, secret_key="CHANGE_ME_TO_A_LONG_RANDOM_SECRET")
+# Sessions live in process memory; set https_only=True when served over HTTPS.
+app.add_middleware(SessionStoreMiddleware)
 
 # If you use Vite proxy, CORS is usually not needed.
 # If you are NOT using proxy, keep this.
@@ -21,15 +31,88 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-def _require_user_id(request: Request) -> int:
+# -------------------------
+# SQL
+# -------------------------
+# Kept as module-level constants so every request passes the exact same string
+# to sqlite3 and hits each connection's prepared-statement cache.
+_SQL_LOGIN_USER = "SELECT id, email, password_hash, role, name FROM users WHERE email = ?"
+
+_SQL_ME_USER = "SELECT id, email, role, name FROM users WHERE id = ?"
+
+# Keyset pagination: filtering and ordering on us.simulation_id (= s.id) lets
+# SQLite walk idx_us_user_sim backwards from the cursor and stop after LIMIT
+# rows, with no sort step.
+_SQL_LIST_SIMS = """
+SELECT
+  s.id,
+  s.name,
+  s.type,
+  COALESCE(s.status, 'running') AS status,
+  COALESCE(s.progress, 0) AS progress,
+  COALESCE(s.participants, 0) AS participants,
+  COALESCE(s.started_at, '—') AS startedAt,
+  COALESCE(s.estimated_end, '—') AS estimatedEnd
+FROM user_simulations us
+JOIN simulations s ON s.id = us.simulation_id
+WHERE us.user_id = ? AND us.simulation_id < ?
+ORDER BY us.simulation_id DESC
+LIMIT ?
+"""
+
+_MAX_SQLITE_INT = 2**63 - 1
+
+_SQL_INSERT_SIM = """
+INSERT INTO simulations (name, type, status, progress, participants, started_at, estimated_end)
+VALUES (?, ?, 'running', 0, 0, datetime('now'), date('now', '+7 day'))
+RETURNING id, name, type,
+          COALESCE(status, 'running') AS status,
+          COALESCE(progress, 0) AS progress,
+          COALESCE(participants, 0) AS participants,
+          COALESCE(started_at, '—') AS startedAt,
+          COALESCE(estimated_end, '—') AS estimatedEnd
+"""
+
+_SQL_ASSIGN_SIM = """
+INSERT OR IGNORE INTO user_simulations (user_id, simulation_id, role)
+VALUES (?, ?, 'admin')
+"""
+
+# One row if the user belongs to the simulation; can_delete is set when they
+# are admin of the simulation OR a global admin.
+_SQL_MEMBERSHIP = """
+SELECT (us.role = 'admin' OR LOWER(u.role) = 'admin') AS can_delete
+FROM user_simulations us
+JOIN users u ON u.id = us.user_id
+WHERE us.user_id = ? AND us.simulation_id = ?
+"""
+
+_SQL_DELETE_SIM = "DELETE FROM simulations WHERE id = ?"
+
+# /api/auth/me rows by user id. User rows rarely change; drop the entry from any
+# endpoint that updates a user. Only touched from the event loop, so no lock.
+_USER_CACHE: TTLCache[int, dict] = TTLCache(maxsize=10_000, ttl=30)
+
+# Login rows (including password_hash) by email, so a repeated login within the
+# TTL skips the SELECT. Drop the entry from any endpoint that changes a user's
+# email, password or role.
+_LOGIN_CACHE: TTLCache[str, dict] = TTLCache(maxsize=10_000, ttl=30)
+
+class _NotAuthenticated(Exception):
+    pass
+
+@app.exception_handler(_NotAuthenticated)
+async def _not_authenticated(request: Request, exc: _NotAuthenticated):
+    return JSONResponse({"error": "Not authenticated"}, status_code=401)
+
+async def _require_user_id(request: Request) -> int:
+    """Dependency for auth-gated routes. Rejects a missing session before the
+    handler runs, so unauthenticated requests never reach SQLite."""
     uid = request.session.get("user_id")
     if not uid:
-        raise KeyError("not authenticated")
+        raise _NotAuthenticated()
     return int(uid)
 
-def _is_admin(role: str | None) -> bool:
-    return (role or "").lower() == "admin"
-
 @app.get("/api/health")
 def health():
     return {"ok": True}
@@ -46,26 +129,30 @@ async def login(request: Request):
     if not email or not password:
         return JSONResponse({"error": "Email and password required"}, status_code=400)
 
-    with get_conn() as conn:
-        user = conn.execute(
-            "SELECT id, email, password_hash, role, name FROM users WHERE email = ?",
-            (email,),
-        ).fetchone()
+    user = _LOGIN_CACHE.get(email)
+    if user is None:
+        async with get_reader() as conn, conn.execute(_SQL_LOGIN_USER, (email,)) as cur:
+            row = await cur.fetchone()
+        if row:
+            user = _LOGIN_CACHE[email] = dict(row)
 
-    if not user or not verify_password(password, user["password_hash"]):
+    # bcrypt is deliberately slow; keep it off the event loop
+    if not user or not await to_thread.run_sync(verify_password, password, user["password_hash"]):
         return JSONResponse({"error": "Invalid email or password"}, status_code=401)
 
-    request.session["user_id"] = int(user["id"])
+    uid = int(user["id"])
+    request.session["user_id"] = uid
 
-    return {
-        "ok": True,
-        "user": {
-            "id": user["id"],
-            "email": user["email"],
-            "role": user["role"],
-            "name": user["name"],
-        },
+    public = {
+        "id": user["id"],
+        "email": user["email"],
+        "role": user["role"],
+        "name": user["name"],
     }
+    # The client usually calls /api/auth/me right after logging in
+    _USER_CACHE[uid] = public
+
+    return {"ok": True, "user": public}
 
 @app.post("/api/auth/logout")
 def logout(request: Request):
@@ -73,63 +160,44 @@ def logout(request: Request):
     return {"ok": True}
 
 @app.get("/api/auth/me")
-def me(request: Request):
-    try:
-        uid = _require_user_id(request)
-    except KeyError:
-        return JSONResponse({"error": "Not authenticated"}, status_code=401)
+async def me(request: Request, uid: int = Depends(_require_user_id)):
+    user = _USER_CACHE.get(uid)
 
-    with get_conn() as conn:
-        user = conn.execute(
-            "SELECT id, email, role, name FROM users WHERE id = ?",
-            (uid,),
-        ).fetchone()
+    if user is None:
+        async with get_reader() as conn, conn.execute(_SQL_ME_USER, (uid,)) as cur:
+            row = await cur.fetchone()
+        if not row:
+            request.session.clear()
+            return JSONResponse({"error": "Not authenticated"}, status_code=401)
 
-    if not user:
-        request.session.clear()
-        return JSONResponse({"error": "Not authenticated"}, status_code=401)
+        user = _USER_CACHE[uid] = dict(row)
 
-    return {"user": dict(user)}
+    return {"user": user}
 
 # -------------------------
 # SIMULATIONS
 # -------------------------
 @app.get("/api/simulations")
-def list_simulations(request: Request):
-    try:
-        uid = _require_user_id(request)
-    except KeyError:
-        return JSONResponse({"error": "Not authenticated"}, status_code=401)
-
-    with get_conn() as conn:
-        rows = conn.execute(
-            """
-            SELECT
-              s.id,
-              s.name,
-              s.type,
-              COALESCE(s.status, 'running') AS status,
-              COALESCE(s.progress, 0) AS progress,
-              COALESCE(s.participants, 0) AS participants,
-              COALESCE(s.started_at, '—') AS startedAt,
-              COALESCE(s.estimated_end, '—') AS estimatedEnd
-            FROM user_simulations us
-            JOIN simulations s ON s.id = us.simulation_id
-            WHERE us.user_id = ?
-            ORDER BY s.id DESC
-            """,
-            (uid,),
-        ).fetchall()
-
-    return {"simulations": [dict(r) for r in rows]}
+async def list_simulations(
+    uid: int = Depends(_require_user_id),
+    after: int | None = Query(None, ge=1, le=_MAX_SQLITE_INT),
+    limit: int = Query(50, ge=1, le=200),
+):
+    # `after` is the `next` value of the previous page; omit it for the newest
+    before_id = after if after is not None else _MAX_SQLITE_INT
 
-@app.post("/api/simulations")
-async def create_simulation(request: Request):
-    try:
-        uid = _require_user_id(request)
-    except KeyError:
-        return JSONResponse({"error": "Not authenticated"}, status_code=401)
+    # Rows arrive in iter_chunk_size batches, one thread hop per batch
+    async with get_reader() as conn, conn.execute(_SQL_LIST_SIMS, (uid, before_id, limit)) as cur:
+        cols = [d[0] for d in cur.description]
+        sims = [dict(zip(cols, r)) async for r in cur]
+
+    next_after = sims[-1]["id"] if len(sims) == limit else None
+
+    # Returning the response directly skips FastAPI's jsonable_encoder pass
+    return ORJSONResponse({"simulations": sims, "next": next_after})
 
+@app.post("/api/simulations")
+async def create_simulation(request: Request, uid: int = Depends(_require_user_id)):
     data = await request.json()
     name = (data.get("name") or "").strip()
     sim_type = (data.get("type") or "phishing").strip()
@@ -137,72 +205,31 @@ async def create_simulation(request: Request):
     if not name:
         return JSONResponse({"error": "Simulation name is required"}, status_code=400)
 
-    with get_conn() as conn:
-        # Create simulation
-        cur = conn.execute(
-            """
-            INSERT INTO simulations (name, type, status, progress, participants, started_at, estimated_end)
-            VALUES (?, ?, 'running', 0, 0, datetime('now'), date('now', '+7 day'))
-            """,
-            (name, sim_type),
-        )
-        sim_id = cur.lastrowid
+    # Both INSERTs commit together; RETURNING hands back the new row so no
+    # follow-up SELECT is needed.
+    async with get_writer() as conn:
+        async with conn.execute(_SQL_INSERT_SIM, (name, sim_type)) as cur:
+            created = await cur.fetchone()
 
         # Assign to creator (so it shows up immediately)
-        conn.execute(
-            """
-            INSERT OR IGNORE INTO user_simulations (user_id, simulation_id, role)
-            VALUES (?, ?, 'admin')
-            """,
-            (uid, sim_id),
-        )
-
-        conn.commit()
-
-        created = conn.execute(
-            """
-            SELECT id, name, type,
-                   COALESCE(status, 'running') AS status,
-                   COALESCE(progress, 0) AS progress,
-                   COALESCE(participants, 0) AS participants,
-                   COALESCE(started_at, '—') AS startedAt,
-                   COALESCE(estimated_end, '—') AS estimatedEnd
-            FROM simulations WHERE id = ?
-            """,
-            (sim_id,),
-        ).fetchone()
+        await conn.execute(_SQL_ASSIGN_SIM, (uid, created["id"]))
 
     return {"ok": True, "simulation": dict(created)}
 
 @app.delete("/api/simulations/{simulation_id}")
-def delete_simulation(simulation_id: int, request: Request):
-    try:
-        uid = _require_user_id(request)
-    except KeyError:
-        return JSONResponse({"error": "Not authenticated"}, status_code=401)
-
-    with get_conn() as conn:
+async def delete_simulation(simulation_id: int, uid: int = Depends(_require_user_id)):
+    async with get_writer() as conn:
         # Check user has access to this simulation and whether they’re admin for it
-        membership = conn.execute(
-            """
-            SELECT us.role, u.role as user_role
-            FROM user_simulations us
-            JOIN users u ON u.id = us.user_id
-            WHERE us.user_id = ? AND us.simulation_id = ?
-            """,
-            (uid, simulation_id),
-        ).fetchone()
+        async with conn.execute(_SQL_MEMBERSHIP, (uid, simulation_id)) as cur:
+            membership = await cur.fetchone()
 
         if not membership:
             return JSONResponse({"error": "Not found"}, status_code=404)
 
-        # Allow delete if simulation-role admin OR global user role admin
-        allowed = (membership["role"] == "admin") or _is_admin(membership["user_role"])
-        if not allowed:
+        if not membership["can_delete"]:
             return JSONResponse({"error": "Forbidden"}, status_code=403)
 
-        conn.execute("DELETE FROM simulations WHERE id = ?", (simulation_id,))
-        conn.execute("DELETE FROM user_simulations WHERE simulation_id = ?", (simulation_id,))
-        conn.commit()
+        # user_simulations rows go with it via ON DELETE CASCADE
+        await conn.execute(_SQL_DELETE_SIM, (simulation_id,))
 
     return {"ok": True}
@@ -0,0 +1,69 @@
+from __future__ import annotations
+import secrets
+
+from cachetools import TTLCache
+from starlette.datastructures import MutableHeaders
+from starlette.requests import HTTPConnection
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+SESSION_MAX_AGE = 14 * 24 * 60 * 60  # 14 days, in seconds
+
+# Process-local session store: sid -> session dict. Sessions do not survive a
+# restart and are not shared between workers, so run a single worker.
+SESSIONS: TTLCache[str, dict] = TTLCache(maxsize=100_000, ttl=SESSION_MAX_AGE)
+
+
+class SessionStoreMiddleware:
+    """Drop-in for Starlette's SessionMiddleware that keeps session data
+    server-side and only sends an opaque `sid` cookie, so `request.session`
+    costs a dict lookup instead of an HMAC check and JSON decode."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        session_cookie: str = "sid",
+        path: str = "/",
+        https_only: bool = False,
+    ) -> None:
+        self.app = app
+        self.session_cookie = session_cookie
+        self.path = path
+        self.security_flags = "httponly; samesite=lax"
+        if https_only:
+            self.security_flags += "; secure"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        sid = HTTPConnection(scope).cookies.get(self.session_cookie)
+        stored = SESSIONS.get(sid) if sid else None
+        # Handlers get a copy, so any change is visible against `stored` below
+        scope["session"] = dict(stored) if stored is not None else {}
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                session = scope["session"]
+                if session != (stored or {}):
+                    # Never keep a sid across a change (e.g. login): a sid the
+                    # client already held could have been planted by someone
+                    # else, so retire it and issue a fresh one.
+                    if stored is not None:
+                        SESSIONS.pop(sid, None)
+                    if session:
+                        new_sid = secrets.token_urlsafe(32)
+                        SESSIONS[new_sid] = session
+                        self._set_cookie(message, new_sid, f"Max-Age={SESSION_MAX_AGE}; ")
+                    else:
+                        self._set_cookie(message, "null", "expires=Thu, 01 Jan 1970 00:00:00 GMT; ")
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+    def _set_cookie(self, message: Message, value: str, lifetime: str) -> None:
+        headers = MutableHeaders(scope=message)
+        headers.append(
+            "Set-Cookie",
+            f"{self.session_cookie}={value}; path={self.path}; {lifetime}{self.security_flags}",
+        )
@@ -5,6 +5,7 @@ CREATE TABLE IF NOT EXISTS users (
   email TEXT NOT NULL UNIQUE,
   password_hash TEXT NOT NULL,
   role TEXT NOT NULL DEFAULT 'user',
+  name TEXT,
   created_at TEXT NOT NULL DEFAULT (datetime('now'))
 );
 
@@ -12,8 +13,13 @@ CREATE TABLE IF NOT EXISTS simulations (
   id INTEGER PRIMARY KEY AUTOINCREMENT,
   name TEXT NOT NULL,
   description TEXT,
+  type TEXT NOT NULL DEFAULT 'phishing',
   status TEXT NOT NULL DEFAULT 'draft',
-  created_by INTEGER NOT NULL,
+  progress INTEGER NOT NULL DEFAULT 0,
+  participants INTEGER NOT NULL DEFAULT 0,
+  started_at TEXT,
+  estimated_end TEXT,
+  created_by INTEGER,
   created_at TEXT NOT NULL DEFAULT (datetime('now')),
   FOREIGN KEY (created_by) REFERENCES users(id)
 );
@@ -26,3 +32,16 @@ CREATE TABLE IF NOT EXISTS simulation_members (
   FOREIGN KEY (simulation_id) REFERENCES simulations(id),
   FOREIGN KEY (user_id) REFERENCES users(id)
 );
+
+CREATE TABLE IF NOT EXISTS user_simulations (
+  user_id INTEGER NOT NULL,
+  simulation_id INTEGER NOT NULL,
+  role TEXT NOT NULL DEFAULT 'player',
+  FOREIGN KEY (user_id) REFERENCES users(id),
+  FOREIGN KEY (simulation_id) REFERENCES simulations(id) ON DELETE CASCADE
+);
+
+-- (user_id, simulation_id) serves the per-user listing and the delete
+-- membership check, and is the conflict target for INSERT OR IGNORE.
+CREATE UNIQUE INDEX IF NOT EXISTS idx_us_user_sim ON user_simulations(user_id, simulation_id);
+CREATE INDEX IF NOT EXISTS idx_us_sim ON user_simulations(simulation_id);
@@ -1,8 +1,6 @@
-from pathlib import Path
-from app.db import get_conn
+from app.db import BASE_DIR, DB_PATH, connect
 from app.auth import hash_password
 
-BASE_DIR = Path(__file__).resolve().parents[1]
 MIGRATION = BASE_DIR / "migrations" / "001_init.sql"
 
 EMAIL = "admin@example.com"
@@ -12,28 +10,37 @@ ROLE = "admin"
 
 def ensure_schema():
     sql = MIGRATION.read_text(encoding="utf-8")
-    with get_conn() as conn:
-        conn.executescript(sql)
+    fresh = not DB_PATH.exists()
+
+    with connect() as conn:
+        if fresh:
+            # A brand-new database has nothing to lose if first boot dies
+            # mid-migration, so skip journalling and fsyncs while building it.
+            conn.executescript("PRAGMA journal_mode = OFF; PRAGMA synchronous = OFF;")
+
+        # One transaction for the whole script instead of one per statement
+        conn.executescript(f"BEGIN;\n{sql}\nCOMMIT;")
+
+        if fresh:
+            conn.executescript("PRAGMA journal_mode = WAL; PRAGMA synchronous = NORMAL;")
 
 
 def seed_admin():
     email = EMAIL.strip().lower()
 
-    with get_conn() as conn:
-        existing = conn.execute(
-            "SELECT id FROM users WHERE email = ?",
-            (email,),
+    with connect() as conn:
+        row = conn.execute(
+            """
+            INSERT INTO users (email, password_hash, role) VALUES (?, ?, ?)
+            ON CONFLICT(email) DO NOTHING
+            RETURNING id
+            """,
+            (email, hash_password(PASSWORD), ROLE),
         ).fetchone()
 
-        if existing:
-            print("ℹ️ Admin user already exists — nothing to do.")
-            return
-
-        conn.execute(
-            "INSERT INTO users (email, password_hash, role) VALUES (?, ?, ?)",
-            (email, hash_password(PASSWORD), ROLE),
-        )
-        conn.commit()
+    if row is None:
+        print("ℹ️ Admin user already exists — nothing to do.")
+        return
 
     print(f"✅ Admin user created: {email} / {PASSWORD}")
 
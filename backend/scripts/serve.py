@@ -0,0 +1,7 @@
+import uvicorn
+
+if __name__ == "__main__":
+    # One process only: sessions are process-local and SQLite has a single
+    # writer, so extra workers would only contend on the WAL. loop="auto"
+    # picks uvloop wherever it is installed (everywhere but Windows).
+    uvicorn.run("app.main:app", loop="auto", http="httptools", workers=1)